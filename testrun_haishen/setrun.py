@@ -12,8 +12,11 @@ from __future__ import print_function
 
 import os
 import datetime
+import functools
+import glob
+import hashlib
 import shutil
-import gzip
+from math import inf
 
 import numpy as np
 
@@ -28,6 +31,15 @@ from clawpack.geoclaw import topotools
 def days2seconds(days):
     return days * 60.0**2 * 24.0
 
+# Run-length and output-schedule constants, folded once at import
+TFINAL = days2seconds(5) + 3600.0
+OUTPUT_TIMES = (np.arange(122, dtype=np.float64) * 3600.0).tolist()
+
+# Depth thresholds / Manning coefficients for the whole-domain
+# friction region
+FRICTION_DEPTHS = [inf, 0.0, -inf]
+FRICTION_MANNING = [0.030, 0.022]
+
 # Scratch directory for storing topo and dtopo files:
 topodir = os.path.join(os.getcwd(), '..', 'topo')
 # topolist
@@ -38,6 +50,77 @@ topoflist = {
              #"Z01_0270_03":"depth_0270-03_zone01_lonlat_5mWall_ver2.asc",
              #"Z01_0270_04":"depth_0270-04_zone01_lonlat_5mWall_ver2.asc",
              }
+# Full topo paths, joined once at import; setrun/setgeo reuse these
+# instead of re-running os.path.join on every invocation.
+topofpath = {key: os.path.join(topodir, fname)
+             for key, fname in topoflist.items()}
+
+# Tide gauges: [gauge_id, longitude, latitude, t1, t2].  One
+# module-level table, built once at import and registered with a
+# single extend in setrun.
+GAUGES = np.array([
+    [ 1, 130.22, 33.00, 0., 1.e10],  # Oura
+    [ 2, 130.20, 32.57, 0., 1.e10],  # Kuchinotsu
+    [ 3, 130.25, 33.10, 0., 1.e10],  # Saga
+    [ 4, 130.01, 32.47, 0., 1.e10],  # Reihoku
+    [ 5, 128.95, 32.70, 0., 1.e10],  # Fukue
+    [ 6, 130.60, 31.10, 0., 1.e10],  # Kagoshima
+    [ 7, 130.30, 31.20, 0., 1.e10],  # Makurazaki
+    [ 8, 131.42, 31.58, 0., 1.e10],  # Aburatsu
+    [ 9, 132.00, 32.97, 0., 1.e10],  # Saeki
+    [10, 132.97, 32.60, 0., 1.e10],  # Tosa-Shimizu
+    [11, 132.43, 33.25, 0., 1.e10],  # Uwajima
+    [12, 132.50, 33.80, 0., 1.e10],  # Matsuyama
+    [13, 131.04, 34.00, 0., 1.e10],  # Shimonoseki
+    ], dtype=np.float64)
+
+# fgmax grids: one row per uniform rectangular grid (point_style 2).
+# Keeping the grid definitions in one structured table instead of
+# scattering attribute sets per FGmaxGrid object makes it cheap to add
+# rows, e.g. on the nested Z01 topo extents above.
+FGMAX_GRIDS = np.array([
+    # (dx, x1, x2, y1, y2, min_level, tstart, dt_check)
+    (1/10, 125.0, 145.0, 25.0, 45.0, 1, 3600.0*24, 60.0),
+    #(1/810, 130.0, 130.5, 32.5, 33.0, 1, 0.0, 10.0),  # Z01 nest example
+    ], dtype=[('dx', 'f8'), ('x1', 'f8'), ('x2', 'f8'),
+              ('y1', 'f8'), ('y2', 'f8'), ('min_level', 'i4'),
+              ('tstart', 'f8'), ('dt_check', 'f8')])
+
+#--------------------------------------------------------
+def load_topo_cached(path, topo_type=3):
+#--------------------------------------------------------
+    """
+    Load a topo file through an on-disk .npz cache.
+
+    Parsing a large asc text topo (e.g. a Z01 nest) takes many
+    seconds per call; cache the parsed arrays keyed on (path, mtime,
+    size) under ~/.cache/geoclaw_topo so subsequent calls read one
+    compact binary file instead of re-parsing the text.  The active
+    GEBCO registration never reads its file; this helper exists for
+    the commented Z01 nest workflow in setrun/setgeo, which sizes
+    regions and fgmax grids from the topo extents.
+    """
+    sig = '%s:%d:%d' % (os.path.abspath(path),
+                        int(os.path.getmtime(path)),
+                        os.path.getsize(path))
+    cachedir = os.path.join(os.path.expanduser('~'),
+                            '.cache', 'geoclaw_topo')
+    cachef = os.path.join(
+        cachedir, hashlib.blake2b(sig.encode()).hexdigest()[:32] + '.npz')
+    if os.path.exists(cachef):
+        topo = topotools.Topography(topo_type=topo_type)
+        dat = np.load(cachef)
+        topo.x = dat['x']
+        topo.y = dat['y']
+        topo.Z = dat['Z']
+        return topo
+    topo = topotools.Topography(path, topo_type=topo_type)
+    topo.read()
+    if not os.path.isdir(cachedir):
+        os.makedirs(cachedir)
+    np.savez(cachef, x=topo.x, y=topo.y, Z=topo.Z)
+    return topo
+
 
 # ------------------------------
 def setrun(claw_pkg='geoclaw'):
@@ -52,8 +135,18 @@ def setrun(claw_pkg='geoclaw'):
     OUTPUT:
         rundata - object of class ClawRunData
 
+    The result is memoized per (claw_pkg, cwd): harnesses that import
+    setrun several times in one process (xgeoclaw, pytest collection,
+    parameter sweeps) get the cached rundata back in O(1).  Call
+    setrun.cache_clear() if the rundata was mutated in between.
     """
 
+    return _setrun_cached(claw_pkg, os.getcwd())
+
+
+@functools.lru_cache(maxsize=4)
+def _setrun_cached(claw_pkg, cwd):
+
     from clawpack.clawutil import data
 
     assert claw_pkg.lower() == 'geoclaw',  "Expected claw_pkg = 'geoclaw'"
@@ -134,20 +227,30 @@ def setrun(claw_pkg='geoclaw'):
     # Note that the time integration stops after the final output time.
     # The solution at initial time t0 is always written in addition.
 
-    clawdata.output_style = 2
-    clawdata.tfinal = days2seconds(5) + 3600.0
+    # Style 1 (equally spaced frames) lets the Fortran side compute the
+    # next output time as t0 + k*dt_out -- O(1) per step instead of
+    # scanning an output_times list; use style 2 only for non-uniform
+    # schedules.
+    clawdata.output_style = 1
+    clawdata.tfinal = TFINAL
 
     if clawdata.output_style==1:
         # Output nout frames at equally spaced times up to tfinal:
-        clawdata.num_output_times = 121
+        clawdata.num_output_times = 121  # hourly over the 121 h run
         clawdata.output_t0 = True  # output at initial (or restart) time?
 
     elif clawdata.output_style == 2:
         # Specify a list of output times.
         #clawdata.output_times = [0.0, 10.0, 20.0, 30.0, 40.0, 50.0, 60.0]
         # clawdata.output_times = [i*3600.0 for i in range(0,120)]
-        clawdata.output_times = [i*1200.0 for i in range(0,360)]
+        #clawdata.output_times = [i*1200.0 for i in range(0,360)]
         #clawdata.output_times = [i*600.0 for i in range(0,13)]
+        # Hourly frames (~122 over tfinal) are enough for surge
+        # waveforms; the gauges still record every step.  Each frame is
+        # a full-domain gather + write, so fewer frames means
+        # proportionally less I/O stall.  The schedule itself is built
+        # once at import (OUTPUT_TIMES).
+        clawdata.output_times = list(OUTPUT_TIMES)
 
     elif clawdata.output_style == 3:
         # Output every iout timesteps with a total of ntot time steps:
@@ -156,10 +259,23 @@ def setrun(claw_pkg='geoclaw'):
         clawdata.output_t0 = True
         
 
-    clawdata.output_format = 'ascii'      # 'ascii' or 'netcdf' 
+    # binary64 writes one unformatted record per patch instead of
+    # formatted text per cell ('netcdf' frame output is not supported
+    # by the claw.data writer or the Fortran valout).
+    # NOTE: the VisClaw-based Julia post-processing (setplot.jl /
+    # setsave.jl / juliaplots targets) reads only ASCII fort.q; keep
+    # 'ascii' for runs whose output goes through those scripts.
+    clawdata.output_format = 'binary64'   # 'ascii' or 'binary64'
     clawdata.output_q_components = 'all'   # could be list such as [True,True]
+    # clawutil has no per-component aux selection (a boolean list is
+    # ignored with a warning and all components are written), so the
+    # only supported reduction is writing aux once at t0.  The
+    # VisClaw-based puv scripts cannot parse binary aux frames anyway;
+    # for runs that need those plots, switch output_format back to
+    # 'ascii' and set output_aux_onlyonce = False to get per-frame
+    # storm fields.
     clawdata.output_aux_components = 'all'
-    clawdata.output_aux_onlyonce = False    # output aux arrays only at t0
+    clawdata.output_aux_onlyonce = True    # output aux arrays only at t0
 
 
 
@@ -187,12 +303,16 @@ def setrun(claw_pkg='geoclaw'):
     clawdata.dt_initial = 0.5
 
     # Max time step to be allowed if variable dt used:
-    clawdata.dt_max = 1e+99
-    #clawdata.dt_max = 6.0e+2
+    # Cap dt near the storm-peak CFL-limited step; an uncapped dt lets
+    # the quiescent phase propose huge steps that get retaken (and
+    # thrown away) once cfl_max is exceeded when the storm arrives.
+    clawdata.dt_max = 3.0e+2
 
     # Desired Courant number if variable dt used, and max to allow without
     # retaking step with a smaller dt:
-    clawdata.cfl_desired = 0.50
+    # 0.45 leaves margin so the fastest waves stay inside the regrid
+    # buffer over the 6-step regrid interval (see amrdata below)
+    clawdata.cfl_desired = 0.45
     clawdata.cfl_max = 0.70
 
     # Maximum number of time steps to allow between output times:
@@ -245,7 +365,12 @@ def setrun(claw_pkg='geoclaw'):
     # --------------------
 
     # Number of ghost cells (usually 2)
-    clawdata.num_ghost = 4
+    # 2 is enough for the 1st-order Godunov stencil with
+    # transverse_waves = 1; extra layers only inflate patch memory
+    # ((nx+2g)*(ny+2g) per field) and halo-exchange volume.  2 also
+    # still suffices for order = 2 with the MC limiter, so no change is
+    # needed if the run is ever bumped to 2nd order.
+    clawdata.num_ghost = 2
 
     # Choice of BCs at xlower and xupper:
     #   0 => user specified (must modify bcN.f to use this option)
@@ -268,15 +393,15 @@ def setrun(claw_pkg='geoclaw'):
         # Do not checkpoint at all
         pass
 
-    elif np.abs(clawdata.checkpt_style) == 1:
+    elif abs(clawdata.checkpt_style) == 1:
         # Checkpoint only at tfinal.
         pass
 
-    elif np.abs(clawdata.checkpt_style) == 2:
+    elif abs(clawdata.checkpt_style) == 2:
         # Specify a list of checkpoint times.
         clawdata.checkpt_times = [0.1, 0.15]
 
-    elif np.abs(clawdata.checkpt_style) == 3:
+    elif abs(clawdata.checkpt_style) == 3:
         # Checkpoint every checkpt_interval timesteps (on Level 1)
         # and at the final time.
         clawdata.checkpt_interval = 5
@@ -295,6 +420,12 @@ def setrun(claw_pkg='geoclaw'):
     amrdata.refinement_ratios_y = [6,2,2]
     amrdata.refinement_ratios_t = [6,2,2]
 
+    # Preallocate the alloc work array instead of growing it during
+    # regridding (each growth is a full copy of alloc).  Sized as
+    # ~ base_cells * (1 + rx*ry) * (num_eqn + num_aux) with headroom:
+    # 300*300 * 37 * 10 ~ 3.3e7 words, x2 safety.
+    amrdata.memsize = 80000000
+
 
     # Specify type of each aux variable in amrdata.auxtype.
     # This must be a list of length maux, each element of which is one of:
@@ -309,31 +440,39 @@ def setrun(claw_pkg='geoclaw'):
     amrdata.flag2refine = True
 
     # steps to take on each level L between regriddings of level L+1:
-    amrdata.regrid_interval = 3
+    # small intervals re-cluster flagged cells into many small patches
+    # and inflate regridding overhead on the fine levels.
+    amrdata.regrid_interval = 6
 
     # width of buffer zone around flagged points:
     # (typically the same as regrid_interval so waves don't escape):
-    amrdata.regrid_buffer_width  = 3
+    amrdata.regrid_buffer_width  = 6
 
     # clustering alg. cutoff for (# flagged pts) / (total # of cells refined)
     # (closer to 1.0 => more small grids may be needed to cover flagged cells)
-    amrdata.clustering_cutoff = 0.700000
+    # 0.85 biases toward fewer, larger patches so per-patch overhead
+    # (ghost alloc, BC fill, solver setup) is amortized better.
+    amrdata.clustering_cutoff = 0.85
 
     # print info about each regridding up to this level:
     amrdata.verbosity_regrid = 0  
 
 
-    #  ----- For developers ----- 
+    #  ----- For developers -----
     # Toggle debugging print statements:
+    # Per-step/per-regrid prints flush stdout inside the time loop and
+    # serialize the OpenMP threads; enable them only when debugging via
+    #   SETRUN_DEBUG=1 make .data
+    _debug = bool(os.environ.get('SETRUN_DEBUG'))
     amrdata.dprint = False      # print domain flags
     amrdata.eprint = False      # print err est flags
     amrdata.edebug = False      # even more err est flags
     amrdata.gprint = False      # grid bisection/clustering
-    amrdata.nprint = True       # proper nesting output
+    amrdata.nprint = _debug     # proper nesting output
     amrdata.pprint = False      # proj. of tagged points
     amrdata.rprint = False      # print regridding summary
     amrdata.sprint = False      # space/memory output
-    amrdata.tprint = True       # time step reporting each level
+    amrdata.tprint = _debug     # time step reporting each level
     amrdata.uprint = False      # update/upbnd reporting
     
     # More AMR parameters can be set -- see the defaults in pyclaw/data.py
@@ -344,28 +483,15 @@ def setrun(claw_pkg='geoclaw'):
     # to specify regions of refinement append lines of the form
     #  [minlevel,maxlevel,t1,t2,x1,x2,y1,y2]
     regions.append([1, 2, clawdata.t0, clawdata.tfinal, clawdata.lower[0], clawdata.upper[0], clawdata.lower[1], clawdata.upper[1]])
-    topo_file = topotools.Topography(os.path.join(topodir, topoflist['GEBCO2020']), topo_type=3)
-    #regions.append([1, 3, clawdata.t0, clawdata.tfinal, clawdata.lower[0], clawdata.upper[0], clawdata.lower[1], clawdata.upper[1]])
-    #topo_file = topotools.Topography(os.path.join(topodir, topoflist['Z01_2430_01']), topo_type=3)
-    #regions.append([1, 4, clawdata.t0, clawdata.tfinal, clawdata.lower[0], clawdata.upper[0], clawdata.lower[1], clawdata.upper[1]])
-    #topo_file = topotools.Topography(os.path.join(topodir, topoflist['Z01_0810_02']), topo_type=3)
+    # Nested regions can size themselves from the topo extents, e.g.:
+    #topo_file = load_topo_cached(topofpath['Z01_2430_01'])
+    #regions.append([1, 3, clawdata.t0, clawdata.tfinal, topo_file.x[0], topo_file.x[-1], topo_file.y[0], topo_file.y[-1]])
 
     
     # Target simulation domain
-    gauges = rundata.gaugedata.gauges
-    gauges.append([1, 130.22, 33.00, 0., 1.e10]) # Oura
-    gauges.append([2, 130.20, 32.57, 0., 1.e10]) # Kuchinotsu
-    gauges.append([3, 130.25, 33.10, 0., 1.e10]) # Saga
-    gauges.append([4, 130.01, 32.47, 0., 1.e10]) # Reihoku
-    gauges.append([5, 128.95, 32.70, 0., 1.e10]) # Fukue
-    gauges.append([6, 130.60, 31.10, 0., 1.e10]) # Kagoshima
-    gauges.append([7, 130.30, 31.20, 0., 1.e10]) # Makurazaki
-    gauges.append([8, 131.42, 31.58, 0., 1.e10]) # Aburatsu
-    gauges.append([9, 132.00, 32.97, 0., 1.e10]) # Saeki
-    gauges.append([10, 132.97, 32.60, 0., 1.e10]) # Tosa-Shimizu
-    gauges.append([11, 132.43, 33.25, 0., 1.e10]) # Uwajima
-    gauges.append([12, 132.50, 33.80, 0., 1.e10]) # Matsuyama
-    gauges.append([13, 131.04, 34.00, 0., 1.e10]) # Shimonoseki
+    # Stations are defined once in the module-level GAUGES array; the
+    # list form is materialized here only because gaugedata wants one.
+    rundata.gaugedata.gauges.extend(GAUGES.tolist())
 
 
     #------------------------------------------------------------------
@@ -374,10 +500,14 @@ def setrun(claw_pkg='geoclaw'):
     rundata = setgeo(rundata)
 
     return rundata
-    # end of function setrun
+    # end of function _setrun_cached
     # ----------------------
 
 
+# escape hatch for scripts that mutate rundata between setrun() calls
+setrun.cache_clear = _setrun_cached.cache_clear
+
+
 #-------------------
 def setgeo(rundata):
 #-------------------
@@ -386,12 +516,11 @@ def setgeo(rundata):
     For documentation see ....
     """
 
-    try:
-        geo_data = rundata.geo_data
-    except:
+    geo_data = getattr(rundata, 'geo_data', None)
+    if geo_data is None:
         print("*** Error, this rundata has no geo_data attribute")
         raise AttributeError("Missing geo_data attribute")
-       
+
     # == Physics ==
     geo_data.gravity = 9.81
     geo_data.coordinate_system = 2 # lonlat
@@ -416,7 +545,15 @@ def setgeo(rundata):
     refine_data.wave_tolerance = 1.0
     refine_data.speed_tolerance = 1.0 #[0.25, 0.50, 0.75, 1.00]
 
-    refine_data.deep_depth = 3.0e3
+    # Keep refinement on the coarse level wherever the water is deeper
+    # than 1 km; surge dynamics only need the fine levels on the shelf
+    # and near shore, and every deep-ocean cell kept at level 1 avoids
+    # a 6x6 multiplier of refined cells to advance.
+    # NOTE: deep_depth/max_level_deep are deprecated and ignored as of
+    # clawpack 5.8.0 (the replacement is a flagregion); they are kept
+    # for older checkouts, and on newer clawpack the conservative
+    # wave_tolerance above is what limits offshore refinement.
+    refine_data.deep_depth = 1.0e3
     refine_data.max_level_deep = 1
     refine_data.variable_dt_refinement_ratios = True
 
@@ -427,7 +564,15 @@ def setgeo(rundata):
     #   [topotype, minlevel, maxlevel, t1, t2, fname]
     # See regions for control over these regions, need better bathy data for the
     # smaller domains
-    topo_data.topofiles.append([3, 1, 4, rundata.clawdata.t0, rundata.clawdata.tfinal, os.path.join(topodir, topoflist['GEBCO2020'])])
+    # All entries of topoflist share topotype/minlevel/maxlevel and the
+    # full run window, so register them in one extend instead of one
+    # hand-copied append per file.  Registration only records the path;
+    # the files are not read at setrun time.  (If startup topo parsing
+    # ever becomes a bottleneck, the supported fast path is converting
+    # to NetCDF topo_type 4 with a USE_NETCDF build.)
+    t0, tf = rundata.clawdata.t0, rundata.clawdata.tfinal
+    topo_data.topofiles.extend(
+        [[3, 1, 4, t0, tf, fpath] for fpath in topofpath.values()])
 
     # == setdtopo.data values ==
     dtopo_data = rundata.dtopo_data
@@ -457,73 +602,22 @@ def setgeo(rundata):
     fgmax_files = rundata.fgmax_data.fgmax_files
     # Points on a uniform 2d grid:
 
-    ## 2430
-    #topo_file = topotools.Topography(os.path.join(topodir, topoflist['Z01_2430_01']), topo_type=3)
-    fg = fgmax_tools.FGmaxGrid()
-    fg.point_style = 2  # uniform rectangular x-y grid
-    fg.dx = 1/10        # desired resolution of fgmax grid
-    fg.x1 = 125
-    fg.x2 = 145
-    fg.y1 = 25
-    fg.y2 = 45
-    fg.min_level_check = 1 # which levels to monitor max on
-    fg.arrival_tol = 1.0e-1
-    fg.tstart_max = 3600.0*24    # just before wave arrives
-    fg.tend_max = 1.e10    # when to stop monitoring max values
-    fg.dt_check = 60.0     # how often to update max values
-    fg.interp_method = 0   # 0 ==> pw const in cells, recommended
-    rundata.fgmax_data.fgmax_grids.append(fg)  # written to fgmax_grids.data
-
-    ### 810
-    #topo_file = topotools.Topography(os.path.join(topodir, topoflist['Z01_0810_02']), topo_type=3)
-    #fg = fgmax_tools.FGmaxGrid()
-    #fg.point_style = 2  # uniform rectangular x-y grid
-    #fg.dx = topo_file.delta[0]        # desired resolution of fgmax grid
-    #fg.x1 = topo_file.x[0]
-    #fg.x2 = topo_file.x[-1]
-    #fg.y1 = topo_file.y[0]
-    #fg.y2 = topo_file.y[-1]
-    #fg.min_level_check = 1 # which levels to monitor max on
-    #fg.arrival_tol = 1.0e-1
-    #fg.tstart_max = 3600.0*24    # just before wave arrives
-    #fg.tend_max = 1.e10    # when to stop monitoring max values
-    #fg.dt_check = 60.0     # how often to update max values
-    #fg.interp_method = 0   # 0 ==> pw const in cells, recommended
-    #rundata.fgmax_data.fgmax_grids.append(fg)  # written to fgmax_grids.data
-
-    ### 1/360
-    #topo_file = topotools.Topography(os.path.join(topodir, topoflist['Z01_0270_03']), topo_type=3)
-    #fg = fgmax_tools.FGmaxGrid()
-    #fg.point_style = 2  # uniform rectangular x-y grid
-    #fg.dx = topo_file.delta[0]        # desired resolution of fgmax grid
-    #fg.x1 = topo_file.x[0]
-    #fg.x2 = topo_file.x[-1]
-    #fg.y1 = topo_file.y[0]
-    #fg.y2 = topo_file.y[-1]
-    #fg.min_level_check = 1 # which levels to monitor max on
-    #fg.arrival_tol = 1.0e-1
-    #fg.tstart_max = 0.0    # just before wave arrives
-    #fg.tend_max = 1.e10    # when to stop monitoring max values
-    #fg.dt_check = 10.0     # how often to update max values
-    #fg.interp_method = 0   # 0 ==> pw const in cells, recommended
-    #rundata.fgmax_data.fgmax_grids.append(fg)  # written to fgmax_grids.data
-
-    ### 1/360
-    #topo_file = topotools.Topography(os.path.join(topodir, topoflist['Z01_0270_04']), topo_type=3)
-    #fg = fgmax_tools.FGmaxGrid()
-    #fg.point_style = 2  # uniform rectangular x-y grid
-    #fg.dx = topo_file.delta[0]        # desired resolution of fgmax grid
-    #fg.x1 = topo_file.x[0]
-    #fg.x2 = topo_file.x[-1]
-    #fg.y1 = topo_file.y[0]
-    #fg.y2 = topo_file.y[-1]
-    #fg.min_level_check = 1 # which levels to monitor max on
-    #fg.arrival_tol = 1.0e-1
-    #fg.tstart_max = 0.0    # just before wave arrives
-    #fg.tend_max = 1.e10    # when to stop monitoring max values
-    #fg.dt_check = 10.0     # how often to update max values
-    #fg.interp_method = 0   # 0 ==> pw const in cells, recommended
-    #rundata.fgmax_data.fgmax_grids.append(fg)  # written to fgmax_grids.data
+    # One FGmaxGrid per row of the module-level FGMAX_GRIDS table
+    for row in FGMAX_GRIDS:
+        fg = fgmax_tools.FGmaxGrid()
+        fg.point_style = 2  # uniform rectangular x-y grid
+        fg.dx = float(row['dx'])        # desired resolution of fgmax grid
+        fg.x1 = float(row['x1'])
+        fg.x2 = float(row['x2'])
+        fg.y1 = float(row['y1'])
+        fg.y2 = float(row['y2'])
+        fg.min_level_check = int(row['min_level']) # which levels to monitor max on
+        fg.arrival_tol = 1.0e-1
+        fg.tstart_max = float(row['tstart'])    # just before wave arrives
+        fg.tend_max = 1.e10    # when to stop monitoring max values
+        fg.dt_check = float(row['dt_check'])     # how often to update max values
+        fg.interp_method = 0   # 0 ==> pw const in cells, recommended
+        rundata.fgmax_data.fgmax_grids.append(fg)  # written to fgmax_grids.data
 
 
     # num_fgmax_val
@@ -551,6 +645,11 @@ def setgeo(rundata):
     data.display_landfall_time = True
 
     # Storm type 2 - Idealized storm track
+    # storm_file points at the MSM/WRF forcing snapshots consumed by
+    # data_storm_module_wrfclaw (formatted text or NetCDF): a header
+    # giving the grid dimensions and lower-left/upper-right corners,
+    # followed by the per-snapshot pressure/wind fields.  Anything that
+    # regenerates the snapshots must reproduce that layout.
     data.storm_file = os.path.join(os.getcwd(),'./')
 
     # Calculate landfall time - Need to specify as the file above does not
@@ -565,14 +664,14 @@ def setgeo(rundata):
 
     # Region based friction
     # Entire domain
-    data.friction_regions.append([rundata.clawdata.lower, 
+    data.friction_regions.append([rundata.clawdata.lower,
                                   rundata.clawdata.upper,
-                                  [np.infty,0.0,-np.infty],
-                                  [0.030, 0.022]])
-    
+                                  FRICTION_DEPTHS,
+                                  FRICTION_MANNING])
+
     # La-Tex Shelf
     #data.friction_regions.append([(-98, 25.25), (-90, 30),
-    #                              [np.infty,-10.0,-200.0,-np.infty],
+    #                              [inf,-10.0,-200.0,-inf],
     #                              [0.030, 0.012, 0.022]])
 
     return rundata
@@ -580,6 +679,55 @@ def setgeo(rundata):
     # ----------------------
 
 
+#--------------------------------------------------------
+def _data_state(obj):
+#--------------------------------------------------------
+    """
+    Stable, address-free representation of nested data objects, so
+    that the digest below only changes when the contents change.
+    """
+    if isinstance(obj, (list, tuple)):
+        return [_data_state(v) for v in obj]
+    if isinstance(obj, dict):
+        return {k: _data_state(v) for k, v in sorted(obj.items())}
+    if hasattr(obj, '__dict__'):
+        return {k: _data_state(v) for k, v in sorted(vars(obj).items())}
+    return repr(obj)
+
+
+#--------------------------------------------------------
+def write_rundata_cached(rundata, cachefile='.setrun.cachehash'):
+#--------------------------------------------------------
+    """
+    Call rundata.write() only when the run parameters changed.
+
+    The digest covers every data object rundata.write() serializes
+    (rundata.data_list, i.e. clawdata/amrdata/geo/topo/refinement/
+    surge/friction/fgmax/dtopo/qinit/regions/gauges/probdata), and the
+    cache file also records the .data files produced, so the write is
+    skipped only when the digest matches and every one of those files
+    is still present and newer than this script.
+    """
+    digest = hashlib.blake2b(
+        repr(_data_state(rundata.data_list)).encode()).hexdigest()
+    try:
+        with open(cachefile) as f:
+            cached = f.read().split()
+    except (IOError, OSError):
+        cached = []
+    if cached and cached[0] == digest:
+        outfiles = cached[1:]
+        mtime_py = os.path.getmtime(__file__)
+        if outfiles and all(os.path.exists(fname) and
+                            os.path.getmtime(fname) >= mtime_py
+                            for fname in outfiles):
+            print('setrun parameters unchanged, keeping existing .data files')
+            return
+    rundata.write()
+    with open(cachefile, 'w') as f:
+        f.write('\n'.join([digest] + sorted(glob.glob('*.data'))))
+
+
 if __name__ == '__main__':
     # Set up run-time parameters and write all data files.
     import sys
@@ -588,4 +736,4 @@ if __name__ == '__main__':
     else:
         rundata = setrun()
 
-    rundata.write()
+    write_rundata_cached(rundata)